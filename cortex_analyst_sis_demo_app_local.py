@@ -5,11 +5,14 @@ Cortex Analyst App
 """
 
 import json  # JSONデータを処理するためのライブラリ
-import time
-from typing import Dict, List, Optional, Tuple
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 
 import _snowflake  # Snowflake固有のAPIとの連携用
 import pandas as pd
+import pyarrow as pa
 import streamlit as st  # Webアプリケーション構築用のStreamlitライブラリ
 from snowflake.snowpark.context import (
     get_active_session,
@@ -25,6 +28,10 @@ AVAILABLE_SEMANTIC_MODELS_PATHS = [
     "[YOUR_DATABASE].cortex_analyst.RAW_DATA/[your_semantic_model_file_1.yaml",
     "[YOUR_DATABASE].cortex_analyst.RAW_DATA/[your_semantic_model_file_2.yaml"    
 ]
+# セレクトボックスに表示するファイル名（パスの最後の部分）
+SEMANTIC_MODEL_DISPLAY_NAMES = {
+    path: path.rsplit("/", 1)[-1] for path in AVAILABLE_SEMANTIC_MODELS_PATHS
+}
 API_ENDPOINT = "/api/v2/cortex/analyst/message"
 API_TIMEOUT = 500000  # ミリ秒単位（10倍に拡大）
 
@@ -38,6 +45,44 @@ SUGGESTED_QUESTIONS = [
     "最新のトレンドを分析してください"
 ]
 
+# 日本語での回答を要求するためにユーザーのプロンプトの前に付ける指示
+JAPANESE_INSTRUCTION = """
+
+【重要】以下の点に従って回答してください：
+1. 回答は必ず日本語で行ってください
+2. データ分析の結果や説明は日本語で分かりやすく記述してください
+3. 数値や統計情報には適切な日本語の説明を添えてください
+4. 提案やインサイトも日本語で提供してください
+5. 専門用語は日本語で説明してください
+
+質問: """
+
+# 英語から日本語への一括翻訳クエリ
+# テキストはJSON配列としてバインド変数で渡す（SQLインジェクション防止・ステートメントの再利用）
+TRANSLATE_QUERY = """
+SELECT
+    f.index AS idx,
+    SNOWFLAKE.CORTEX.TRANSLATE(
+        f.value::string,
+        'en',  -- 元の言語（英語）
+        'ja'   -- 翻訳先の言語（日本語）
+    ) AS translated_text
+FROM TABLE(FLATTEN(input => PARSE_JSON(?))) f
+"""
+
+# クエリ結果の型（to_arrowがない古いSnowparkではpandas DataFrame）
+QueryResult = Union[pa.Table, pd.DataFrame]
+
+# 翻訳結果のキャッシュに保持するテキスト数の上限
+TRANSLATION_CACHE_MAX_ENTRIES = 2000
+
+# 日本語（ひらがな、カタカナ、漢字）判定用の正規表現
+JAPANESE_CHAR_PATTERN = re.compile(
+    r"[\u3040-\u309F"  # ひらがな
+    r"\u30A0-\u30FF"  # カタカナ
+    r"\u4E00-\u9FAF]"  # 漢字
+)
+
 
 def translate_to_japanese(text: str) -> str:
     """
@@ -49,29 +94,9 @@ def translate_to_japanese(text: str) -> str:
     Returns:
         str: 翻訳されたテキスト
     """
-    try:
-        # テキストが既に日本語の場合はそのまま返す
-        if contains_japanese(text):
-            return text
-            
-        # TRANSLATE関数を使用して英語から日本語に翻訳
-        query = f"""
-        SELECT SNOWFLAKE.CORTEX.TRANSLATE(
-            '{text.replace("'", "''")}',  -- シングルクォートをエスケープ
-            'en',  -- 元の言語（英語）
-            'ja'   -- 翻訳先の言語（日本語）
-        ) as translated_text
-        """
-        
-        result = session.sql(query).collect()
-        if result and len(result) > 0:
-            return result[0]['TRANSLATED_TEXT']
-        else:
-            return text  # 翻訳に失敗した場合は元のテキストを返す
-            
-    except Exception as e:
-        st.error(f"翻訳エラー: {str(e)}")
-        return text  # エラーの場合は元のテキストを返す
+    # 一括翻訳と同じキャッシュを使用（日本語の場合やエラー時は元のテキストを返す）
+    translated = translate_texts_to_japanese([text])
+    return text if translated is None else translated[0]
 
 
 def contains_japanese(text: str) -> bool:
@@ -85,46 +110,139 @@ def contains_japanese(text: str) -> bool:
         bool: 日本語が含まれている場合True
     """
     # ひらがな、カタカナ、漢字の範囲をチェック
-    for char in text:
-        if (
-            '\u3040' <= char <= '\u309F' or  # ひらがな
-            '\u30A0' <= char <= '\u30FF' or  # カタカナ
-            '\u4E00' <= char <= '\u9FAF'     # 漢字
-        ):
-            return True
-    return False
+    return JAPANESE_CHAR_PATTERN.search(text) is not None
+
+
+@st.cache_resource(show_spinner=False)
+def get_translation_cache() -> Tuple[threading.Lock, "OrderedDict[str, str]"]:
+    """
+    翻訳結果のLRUキャッシュ（テキスト→翻訳）とそのロックを取得（全セッション・再実行間で共有）
+
+    Returns:
+        Tuple[threading.Lock, OrderedDict[str, str]]: キャッシュ用のロックと翻訳結果のキャッシュ
+    """
+    return threading.Lock(), OrderedDict()
+
+
+def get_cached_translations(texts: List[str]) -> Dict[str, str]:
+    """
+    キャッシュ済みの翻訳結果を取得（取得したテキストは最近使用したものとして扱う）
+
+    Args:
+        texts (List[str]): 翻訳対象のテキストのリスト
+
+    Returns:
+        Dict[str, str]: キャッシュにあったテキストとその翻訳
+    """
+    lock, cache = get_translation_cache()
+    found = {}
+    with lock:
+        for text in texts:
+            if text in cache:
+                cache.move_to_end(text)
+                found[text] = cache[text]
+    return found
+
+
+def store_translations(translations: Dict[str, str]):
+    """
+    翻訳結果をキャッシュに保存し、上限を超えた場合は最も古く使用されたものから削除
+
+    Args:
+        translations (Dict[str, str]): テキストとその翻訳
+    """
+    lock, cache = get_translation_cache()
+    with lock:
+        for text, translated_text in translations.items():
+            cache[text] = translated_text
+            cache.move_to_end(text)
+        while len(cache) > TRANSLATION_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+def translate_texts_to_japanese(texts: List[str]) -> Optional[List[str]]:
+    """
+    複数のテキストを1回のSnowflakeクエリでまとめて日本語に翻訳
+    翻訳済みのテキストはキャッシュから返し、未翻訳のテキストのみをクエリに含める
+
+    Args:
+        texts (List[str]): 翻訳対象のテキストのリスト
+
+    Returns:
+        Optional[List[str]]: 翻訳されたテキストのリスト（入力と同じ順序）。
+            翻訳が必要なテキストがない場合はNone
+    """
+    # 既に日本語のテキストは翻訳対象から除外し、重複するテキストは1回だけ翻訳
+    unique_texts = list(dict.fromkeys(text for text in texts if not contains_japanese(text)))
+    if not unique_texts:
+        return None
+
+    # キャッシュにないテキストのみを翻訳
+    translations = get_cached_translations(unique_texts)
+    uncached_texts = [text for text in unique_texts if text not in translations]
+    if not uncached_texts:
+        return [translations.get(text, text) for text in texts]
+
+    try:
+        # TRANSLATE関数を全テキストに対して1回のラウンドトリップで実行
+        # クエリ文字列は常に同一で、テキストはバインド変数で渡す
+        result = session.sql(
+            TRANSLATE_QUERY, params=[json.dumps(uncached_texts, ensure_ascii=False)]
+        ).collect()
+        new_translations = {
+            uncached_texts[row["IDX"]]: row["TRANSLATED_TEXT"]
+            for row in result
+            if row["TRANSLATED_TEXT"]
+        }
+        store_translations(new_translations)
+        translations.update(new_translations)
+    except Exception as e:
+        st.error(f"翻訳エラー: {str(e)}")
+
+    # 翻訳結果を元の位置に戻す（翻訳に失敗したテキストは元のまま）
+    return [translations.get(text, text) for text in texts]
 
 
 def translate_message_content(content: List[Dict]) -> List[Dict]:
     """
     メッセージコンテンツを日本語に翻訳
-    
+
     Args:
         content (List[Dict]): メッセージコンテンツ
-        
+
     Returns:
         List[Dict]: 翻訳されたメッセージコンテンツ
     """
     if not st.session_state.get("japanese_response", True):
         return content
-    
+
+    # 翻訳対象の文字列をすべて収集
+    texts = []
+    for item in content:
+        if item["type"] == "text":
+            texts.append(item["text"])
+        elif item["type"] == "suggestions":
+            texts.extend(item["suggestions"])
+
+    # まとめて翻訳（翻訳が必要な文字列がない場合はコンテンツをそのまま返す）
+    translated_texts = translate_texts_to_japanese(texts)
+    if translated_texts is None:
+        return content
+
+    # 翻訳結果を元の構造に戻す
+    translated_iter = iter(translated_texts)
     translated_content = []
-    
+
     for item in content:
         if item["type"] == "text":
             # テキストを翻訳
-            translated_text = translate_to_japanese(item["text"])
             translated_content.append({
                 "type": "text",
-                "text": translated_text
+                "text": next(translated_iter)
             })
         elif item["type"] == "suggestions":
             # サジェストを翻訳
-            translated_suggestions = []
-            for suggestion in item["suggestions"]:
-                translated_suggestion = translate_to_japanese(suggestion)
-                translated_suggestions.append(translated_suggestion)
-            
+            translated_suggestions = [next(translated_iter) for _ in item["suggestions"]]
             translated_content.append({
                 "type": "suggestions",
                 "suggestions": translated_suggestions
@@ -132,7 +250,7 @@ def translate_message_content(content: List[Dict]) -> List[Dict]:
         else:
             # その他のタイプはそのまま保持
             translated_content.append(item)
-    
+
     return translated_content
 
 
@@ -141,11 +259,18 @@ def main():
     if "messages" not in st.session_state:
         reset_session_state()
     show_header_and_sidebar()
-    if len(st.session_state.messages) == 0:
+    # 新しい質問がある場合は初回のサジェスト質問を表示しないよう、先に入力を取得
+    user_input = st.chat_input("ご質問をどうぞ")
+    if (
+        len(st.session_state.messages) == 0
+        and st.session_state.active_suggestion is None
+        and not user_input
+    ):
         # 初回アクセス時にサジェスト質問を表示
         display_initial_suggestions()
     display_conversation()
-    handle_user_inputs()
+    handle_user_inputs(user_input)
+    display_refresh_button()
     handle_error_notifications()
 
 
@@ -168,7 +293,7 @@ def show_header_and_sidebar():
         st.selectbox(
             "選択されたセマンティックモデル:",
             AVAILABLE_SEMANTIC_MODELS_PATHS,
-            format_func=lambda s: s.split("/")[-1],
+            format_func=SEMANTIC_MODEL_DISPLAY_NAMES.__getitem__,
             key="selected_semantic_model_path",
             on_change=reset_session_state,
         )
@@ -192,25 +317,34 @@ def show_header_and_sidebar():
 def display_initial_suggestions():
     """初回表示時のサジェスト質問を表示"""
     st.subheader("💡 こんな質問ができます")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if st.button(SUGGESTED_QUESTIONS[0], key="initial_suggestion_1", use_container_width=True):
-            process_user_input(SUGGESTED_QUESTIONS[0])
-    
-    with col2:
-        if st.button(SUGGESTED_QUESTIONS[1], key="initial_suggestion_2", use_container_width=True):
-            process_user_input(SUGGESTED_QUESTIONS[1])
-    
-    with col3:
-        if st.button(SUGGESTED_QUESTIONS[2], key="initial_suggestion_3", use_container_width=True):
-            process_user_input(SUGGESTED_QUESTIONS[2])
+    cols = st.columns(len(SUGGESTED_QUESTIONS))
+
+    for i, (col, question) in enumerate(zip(cols, SUGGESTED_QUESTIONS), start=1):
+        with col:
+            st.button(
+                question, key=f"initial_suggestion_{i}", use_container_width=True,
+                on_click=set_active_suggestion, args=(question,),
+            )
 
 
-def handle_user_inputs():
-    """チャットインターフェースからのユーザー入力を処理"""
+def set_active_suggestion(suggestion: str):
+    """
+    クリックされたサジェスト質問を保存（handle_user_inputsで処理される）
+
+    Args:
+        suggestion (str): サジェスト質問
+    """
+    st.session_state.active_suggestion = suggestion
+
+
+def handle_user_inputs(user_input: Optional[str]):
+    """
+    チャットインターフェースからのユーザー入力を処理
+
+    Args:
+        user_input (Optional[str]): チャット入力の内容
+    """
     # チャット入力を処理
-    user_input = st.chat_input("ご質問をどうぞ")
     if user_input:
         process_user_input(user_input)
     # サジェスト質問のクリックを処理
@@ -241,18 +375,7 @@ def enhance_user_prompt(prompt: str) -> str:
         return prompt
     
     # 日本語での回答を要求する指示を追加
-    japanese_instruction = """
-
-【重要】以下の点に従って回答してください：
-1. 回答は必ず日本語で行ってください
-2. データ分析の結果や説明は日本語で分かりやすく記述してください
-3. 数値や統計情報には適切な日本語の説明を添えてください
-4. 提案やインサイトも日本語で提供してください
-5. 専門用語は日本語で説明してください
-
-質問: """
-    
-    return japanese_instruction + prompt
+    return JAPANESE_INSTRUCTION + prompt
 
 
 def process_user_input(prompt: str):
@@ -285,52 +408,134 @@ def process_user_input(prompt: str):
     # アナリストの応答を待つ間、アナリストのチャットメッセージ内にプログレス表示
     with st.chat_message("analyst"):
         with st.spinner("アナリストからの応答を待っています..."):
-            time.sleep(1)
             # API呼び出し用にメッセージを準備（最後のメッセージを拡張版に置き換え）
-            api_messages = st.session_state.messages[:-1] + [api_message]
-            response, error_msg = get_analyst_response(api_messages)
+            # 翻訳済みコンテンツなど表示用のキーはAPIに送らない
+            api_messages = [
+                {"role": message["role"], "content": message["content"]}
+                for message in st.session_state.messages[:-1]
+            ] + [api_message]
+            # 「最新の結果を取得」が押された場合はキャッシュを使わない
+            use_cache = not st.session_state.pop("bypass_analyst_cache", False)
+            response, error_msg = get_analyst_response(api_messages, use_cache=use_cache)
             
             if error_msg is None:
-                # 日本語翻訳が有効な場合はコンテンツを翻訳
-                content = response["message"]["content"]
-                if st.session_state.get("japanese_response", True):
-                    content = translate_message_content(content)
-                
+                # 元のコンテンツと翻訳済みコンテンツの両方を保持
                 analyst_message = {
                     "role": "analyst",
-                    "content": content,
+                    "content": response["message"]["content"],
+                    "content_ja": None,
                     "request_id": response["request_id"],
+                    "is_error": False,
                 }
             else:
                 # エラーメッセージも翻訳
-                error_text = error_msg
+                content_ja = None
                 if st.session_state.get("japanese_response", True):
-                    error_text = translate_to_japanese(error_msg)
-                
+                    content_ja = [{"type": "text", "text": translate_to_japanese(error_msg)}]
+
                 analyst_message = {
                     "role": "analyst",
-                    "content": [{"type": "text", "text": error_text}],
+                    "content": [{"type": "text", "text": error_msg}],
+                    "content_ja": content_ja,
                     "request_id": response["request_id"],
+                    "is_error": True,
                 }
                 st.session_state["fire_API_error_notify"] = True
+            # 日本語翻訳が有効な場合はここで翻訳し、メッセージに保存
+            get_display_content(analyst_message)
             st.session_state.messages.append(analyst_message)
-            st.rerun()
 
+        # 全履歴を再描画せず、新しい応答のみをそのまま描画
+        analyst_msg_index = len(st.session_state.messages) - 1
+        display_message_content(get_display_content(analyst_message), analyst_msg_index)
+
+
+class AnalystAPIError(Exception):
+    """Cortex Analyst APIがエラーを返した場合の例外（エラー応答をキャッシュしないために使用）"""
+
+    def __init__(self, status: int, parsed_content: Dict):
+        super().__init__(status)
+        self.status = status
+        self.parsed_content = parsed_content
 
-def get_analyst_response(messages: List[Dict]) -> Tuple[Dict, Optional[str]]:
+
+def get_analyst_response(
+    messages: List[Dict], use_cache: bool = True
+) -> Tuple[Dict, Optional[str]]:
     """
     チャット履歴をCortex Analyst APIに送信し、応答を返す
 
     Args:
         messages (List[Dict]): 会話履歴
+        use_cache (bool): 同一のリクエストに対するキャッシュ済みの応答を使用するか
 
     Returns:
         Tuple[Dict, Optional[str]]: Cortex Analyst APIからの応答とエラーメッセージ
     """
+    semantic_model_file = f"@{st.session_state.selected_semantic_model_path}"
+    # キャッシュキーとして会話履歴を正規化したJSON文字列を使用
+    messages_json = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+
+    # キャッシュを使わない場合はキャッシュをクリアし、新しい応答で古い応答を置き換える
+    # （特定キーのみのクリアはStreamlitのバージョンに依存するため、キャッシュ全体をクリア）
+    if not use_cache:
+        get_cached_analyst_response.clear()
+
+    try:
+        parsed_content = get_cached_analyst_response(semantic_model_file, messages_json)
+        # 応答のコンテンツをJSONオブジェクトとして返す
+        return parsed_content, None
+    except AnalystAPIError as e:
+        parsed_content = e.parsed_content
+        # 読みやすいエラーメッセージを作成
+        error_msg = f"""
+🚨 アナリストAPIエラーが発生しました 🚨
+
+* レスポンスコード: `{e.status}`
+* リクエストID: `{parsed_content.get('request_id', 'N/A')}`
+* エラーコード: `{parsed_content.get('error_code', 'N/A')}`
+
+メッセージ:
+{parsed_content.get('message', '詳細不明')}
+
+        """
+        return parsed_content, error_msg
+
+
+@st.cache_data(show_spinner=False, max_entries=500)
+def get_cached_analyst_response(semantic_model_file: str, messages_json: str) -> Dict:
+    """
+    Cortex Analyst APIの応答をセマンティックモデルと会話履歴ごとにキャッシュ
+    エラー応答は例外として送出されるためキャッシュされない
+
+    Args:
+        semantic_model_file (str): セマンティックモデルファイルのパス
+        messages_json (str): JSON文字列にシリアライズされた会話履歴
+
+    Returns:
+        Dict: Cortex Analyst APIからの応答
+    """
+    return send_analyst_request(semantic_model_file, messages_json)
+
+
+def send_analyst_request(semantic_model_file: str, messages_json: str) -> Dict:
+    """
+    Cortex Analyst APIエンドポイントにリクエストを送信
+
+    Args:
+        semantic_model_file (str): セマンティックモデルファイルのパス
+        messages_json (str): JSON文字列にシリアライズされた会話履歴
+
+    Returns:
+        Dict: Cortex Analyst APIからの応答
+
+    Raises:
+        AnalystAPIError: APIがエラーを返した場合
+    """
     # リクエストボディをユーザーのプロンプトで準備
     request_body = {
-        "messages": messages,
-        "semantic_model_file": f"@{st.session_state.selected_semantic_model_path}",
+        "messages": json.loads(messages_json),
+        "semantic_model_file": semantic_model_file,
         "max_tokens": 40000,  # トークン上限を10倍程度に拡大
     }
 
@@ -349,23 +554,9 @@ def get_analyst_response(messages: List[Dict]) -> Tuple[Dict, Optional[str]]:
     parsed_content = json.loads(resp["content"])
 
     # 応答が成功かどうかを確認
-    if resp["status"] < 400:
-        # 応答のコンテンツをJSONオブジェクトとして返す
-        return parsed_content, None
-    else:
-        # 読みやすいエラーメッセージを作成
-        error_msg = f"""
-🚨 アナリストAPIエラーが発生しました 🚨
-
-* レスポンスコード: `{resp['status']}`
-* リクエストID: `{parsed_content.get('request_id', 'N/A')}`
-* エラーコード: `{parsed_content.get('error_code', 'N/A')}`
-
-メッセージ:
-{parsed_content.get('message', '詳細不明')}
-
-        """
-        return parsed_content, error_msg
+    if resp["status"] >= 400:
+        raise AnalystAPIError(resp["status"], parsed_content)
+    return parsed_content
 
 
 def display_conversation():
@@ -374,11 +565,68 @@ def display_conversation():
     """
     for idx, message in enumerate(st.session_state.messages):
         role = message["role"]
-        content = message["content"]
+        content = get_display_content(message)
         with st.chat_message(role):
             display_message_content(content, idx)
 
 
+def display_refresh_button():
+    """
+    最新の応答がキャッシュ可能な成功応答の場合、キャッシュを使わずに再取得するボタンを表示
+    （新しい質問の処理後に呼び出し、常に最新の応答に対して1つだけ表示する）
+    """
+    if not st.session_state.messages:
+        return
+
+    message_index = len(st.session_state.messages) - 1
+    message = st.session_state.messages[message_index]
+    if message["role"] != "analyst" or message.get("is_error", False):
+        return
+
+    st.button(
+        "🔄 最新の結果を取得",
+        key=f"refresh_{message_index}",
+        on_click=refresh_analyst_response,
+        args=(message_index,),
+    )
+
+
+def refresh_analyst_response(message_index: int):
+    """
+    指定したアナリストの応答とその質問を履歴から取り除き、キャッシュを使わずに再質問する
+
+    Args:
+        message_index (int): アナリストのメッセージのインデックス
+    """
+    # 既に新しい質問が追加されている場合は何もしない
+    if message_index != len(st.session_state.messages) - 1:
+        return
+
+    user_message = st.session_state.messages[message_index - 1]
+    del st.session_state.messages[message_index - 1:]
+    st.session_state.active_suggestion = user_message["content"][0]["text"]
+    st.session_state.bypass_analyst_cache = True
+
+
+def get_display_content(message: Dict) -> List[Dict]:
+    """
+    「日本語で回答」の設定に応じて表示用のコンテンツを返す
+    翻訳結果はメッセージに保存し、再実行時や設定切り替え時に再翻訳しない
+
+    Args:
+        message (Dict): 会話履歴のメッセージ
+
+    Returns:
+        List[Dict]: 表示用のメッセージコンテンツ
+    """
+    if message["role"] != "analyst" or not st.session_state.get("japanese_response", True):
+        return message["content"]
+
+    if message.get("content_ja") is None:
+        message["content_ja"] = translate_message_content(message["content"])
+    return message["content_ja"]
+
+
 def display_message_content(content: List[Dict[str, str]], message_index: int):
     """
     単一のメッセージコンテンツを表示
@@ -408,24 +656,40 @@ def display_message_content(content: List[Dict[str, str]], message_index: int):
 
 
 @st.cache_data(show_spinner=False, max_entries=1000)  # キャッシュサイズも拡大
-def get_query_exec_result(query: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+def get_query_exec_result(query: str) -> Tuple[Optional[QueryResult], Optional[str]]:
     """
-    SQLクエリを実行し、結果をpandas DataFrameに変換
+    SQLクエリを実行し、結果をArrowテーブル（またはpandas DataFrame）として取得
 
     Args:
         query (str): SQLクエリ
 
     Returns:
-        Tuple[Optional[pd.DataFrame], Optional[str]]: クエリ結果とエラーメッセージ
+        Tuple[Optional[QueryResult], Optional[str]]: クエリ結果とエラーメッセージ
     """
-    global session
     try:
-        df = session.sql(query).to_pandas()
-        return df, None
+        return run_query(query), None
     except SnowparkSQLException as e:
         return None, str(e)
 
 
+def run_query(query: str) -> QueryResult:
+    """
+    Snowparkセッションでクエリを実行し、結果をArrowテーブルとして返す
+    （to_arrowがない古いSnowparkではpandas DataFrameをそのまま返す）
+
+    Args:
+        query (str): SQLクエリ
+
+    Returns:
+        QueryResult: クエリ結果
+    """
+    df = session.sql(query)
+    # pandasへの変換コストを避けるためArrow形式で取得
+    if hasattr(df, "to_arrow"):
+        return df.to_arrow()
+    return df.to_pandas()
+
+
 def display_sql_query(sql: str, message_index: int):
     """
     SQLクエリを実行し、データフレームとチャートの形で結果を表示
@@ -447,7 +711,7 @@ def display_sql_query(sql: str, message_index: int):
                 st.error(f"生成されたSQLクエリを実行できませんでした。エラー: {err_msg}")
                 return
 
-            if df.empty:
+            if len(df) == 0:
                 st.write("クエリはデータを返しませんでした")
                 return
 
@@ -460,24 +724,25 @@ def display_sql_query(sql: str, message_index: int):
                 display_charts_tab(df, message_index)
 
 
-def display_charts_tab(df: pd.DataFrame, message_index: int) -> None:
+def display_charts_tab(df: QueryResult, message_index: int) -> None:
     """
     チャートタブを表示
 
     Args:
-        df (pd.DataFrame): クエリ結果
+        df (QueryResult): クエリ結果
         message_index (int): メッセージのインデックス
     """
+    # 列の順序を固定してselectboxの選択肢を安定させる
+    all_cols = tuple(df.column_names if isinstance(df, pa.Table) else df.columns)
     # チャートを描画するには少なくとも2列必要
-    if len(df.columns) >= 2:
-        all_cols_set = set(df.columns)
+    if len(all_cols) >= 2:
         col1, col2 = st.columns(2)
         x_col = col1.selectbox(
-            "X軸", all_cols_set, key=f"x_col_select_{message_index}"
+            "X軸", all_cols, key=f"x_col_select_{message_index}"
         )
         y_col = col2.selectbox(
             "Y軸",
-            all_cols_set.difference({x_col}),
+            tuple(c for c in all_cols if c != x_col),
             key=f"y_col_select_{message_index}",
         )
         chart_type = st.selectbox(
@@ -485,10 +750,16 @@ def display_charts_tab(df: pd.DataFrame, message_index: int) -> None:
             options=["線グラフ 📈", "棒グラフ 📊"],
             key=f"chart_type_{message_index}",
         )
+        # 描画に使う2列のみを選択（Arrowテーブルの場合はその2列だけをpandasに変換）
+        if isinstance(df, pa.Table):
+            plot_df = df.select([x_col, y_col]).to_pandas()
+        else:
+            plot_df = df[[x_col, y_col]]
+        chart_data = plot_df.set_index(x_col)[y_col]
         if chart_type == "線グラフ 📈":
-            st.line_chart(df.set_index(x_col)[y_col])
+            st.line_chart(chart_data)
         elif chart_type == "棒グラフ 📊":
-            st.bar_chart(df.set_index(x_col)[y_col])
+            st.bar_chart(chart_data)
     else:
         st.write("チャートの描画には少なくとも2列が必要です")
 